@@ -7,10 +7,18 @@ It receives tool input as JSON on stdin and returns:
   - Exit 0: Allow the command
   - Exit 2: Block the command (stderr message shown to model)
 
+Blocked patterns are matched with the first engine available: Hyperscan
+(pip install hyperscan), google-re2 (pip install google-re2), then the
+standard library re module. The Hyperscan database is compiled once and
+cached next to this file. The optional engines are only imported once a
+command gets past the token prescreen.
+
 Based on Eric Buess's "Everything Agent" hook patterns.
 """
 
+import functools
 import json
+import os
 import re
 import sys
 
@@ -64,6 +72,9 @@ BLOCKED_PATTERNS = [
     r"terraform\s+destroy",                     # terraform destroy
 ]
 
+# Report WARNING_PATTERNS matches on stderr (allowed commands are not blocked)
+LOG_WARNINGS = False
+
 # Patterns that trigger a warning (suspicious but not blocked)
 WARNING_PATTERNS = [
     r"rm\s+-[rfRF]+",                          # any recursive force delete
@@ -76,6 +87,233 @@ WARNING_PATTERNS = [
     r"brew\s+install",                          # homebrew install
 ]
 
+# Serialized Hyperscan database, rebuilt when the patterns or version change
+HYPERSCAN_DB_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "dangerous-command-blocker.hsdb"
+)
+
+
+@functools.cache
+def _re2():
+    """
+    Import google-re2 (linear-time matching, immune to catastrophic
+    backtracking) on first use. Returns (re2, case-insensitive options), or
+    None if it is not installed.
+    """
+    try:
+        import re2
+    except ImportError:
+        return None
+    options = re2.Options()
+    options.case_sensitive = False
+    options.log_errors = False
+    return re2, options
+
+
+def _compile(pattern: str):
+    """
+    Compile a case-insensitive pattern with RE2 when available.
+    Falls back to re if RE2 is missing or rejects the syntax (e.g. lookahead).
+    """
+    engine = _re2()
+    if engine is not None:
+        re2, options = engine
+        try:
+            return re2.compile(pattern, options)
+        except re2.error:
+            pass
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def _search(regex, command: str):
+    """
+    Search command with a regex from _compile.
+    RE2 encodes str input as strict UTF-8 and raises on lone surrogates, so it
+    is given bytes encoded with surrogatepass instead.
+    """
+    if not isinstance(regex, re.Pattern):
+        return regex.search(command.encode("utf-8", "surrogatepass"))
+    return regex.search(command)
+
+
+def _compile_set(patterns: list[str]):
+    """
+    Compile patterns into an RE2 set that reports every matching index in one scan.
+    Returns None if RE2 is missing or rejects any of the patterns.
+    """
+    engine = _re2()
+    if engine is None:
+        return None
+    re2, options = engine
+    pattern_set = re2.Set.SearchSet(options)
+    try:
+        for pattern in patterns:
+            pattern_set.Add(pattern)
+    except re2.error:
+        return None
+    pattern_set.Compile()
+    return pattern_set
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    """Check if pattern has an unescaped | outside parentheses and classes."""
+    depth = 0
+    in_class = False
+    escaped = False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+    return False
+
+
+def _literal_prefix(pattern: str) -> str:
+    """
+    Return the lowercased literal text a pattern starts with (e.g. "curl" for
+    the curl | sh pattern), which every match must contain. Returns "" when the
+    pattern starts with a metacharacter or has a top-level alternation, since
+    then no single prefix is required.
+    """
+    if _has_top_level_alternation(pattern):
+        return ""
+    prefix = re.match(r"[^\\.^$*+?{}\[\]|()]*", pattern).group()
+    # A quantifier after the prefix makes its last character optional
+    if pattern[len(prefix):len(prefix) + 1] in ("*", "?", "{"):
+        prefix = prefix[:-1]
+    return prefix.lower()
+
+
+# Literal prefixes of the blocked patterns, at least one of which every match
+# contains. Most harmless commands (ls, pwd, npm test) contain none of them
+# and skip the regex scan entirely.
+_TRIGGER_TOKENS = {_literal_prefix(p) for p in BLOCKED_PATTERNS}
+
+
+def _load_hyperscan_db(patterns: list[str]):
+    """
+    Load the Hyperscan database for patterns from HYPERSCAN_DB_PATH.
+    Compiles and caches it when the cache is missing or stale (compiling costs
+    tens of milliseconds, loading a fraction of one). Returns None if Hyperscan
+    is missing or cannot compile the patterns.
+    """
+    try:
+        # Hyperscan: SIMD multi-pattern matching, one scan for the whole set
+        import hyperscan
+    except ImportError:
+        return None
+    import hashlib
+
+    mode = hyperscan.HS_MODE_BLOCK
+    flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH
+    # Anything that changes the compiled database must be part of the key
+    key_parts = [hyperscan.__version__, str(mode), str(flags), *patterns]
+    key = hashlib.sha256("\n".join(key_parts).encode()).digest()
+
+    try:
+        with open(HYPERSCAN_DB_PATH, "rb") as f:
+            data = f.read()
+        if data.startswith(key):
+            db = hyperscan.loadb(data[len(key):], mode)
+            db.scratch = hyperscan.Scratch(db)
+            return db
+    except (OSError, hyperscan.error):
+        pass
+
+    db = hyperscan.Database(mode=mode)
+    try:
+        db.compile(
+            expressions=[p.encode() for p in patterns],
+            ids=list(range(len(patterns))),
+            elements=len(patterns),
+            flags=flags,
+        )
+    except hyperscan.error:
+        return None
+
+    # Write via a per-process temp file so concurrent hooks never see a partial cache
+    tmp_path = f"{HYPERSCAN_DB_PATH}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(key + hyperscan.dumpb(db))
+        os.replace(tmp_path, HYPERSCAN_DB_PATH)
+    except OSError:
+        pass
+    return db
+
+
+def _on_hyperscan_match(pattern_id, start, end, flags, hits):
+    """Hyperscan match callback: collect matching pattern ids."""
+    hits.append(pattern_id)
+
+
+@functools.cache
+def _blocked_matcher():
+    """
+    Build a function that returns the index of the first BLOCKED_PATTERNS entry
+    a command matches, or None, using the fastest engine available.
+    Built on first use, so commands rejected by the token prescreen never
+    pay for compiling (or loading) the patterns.
+    """
+    db = _load_hyperscan_db(BLOCKED_PATTERNS)
+    if db is not None:
+        def match(command: str) -> int | None:
+            hits = []
+            db.scan(command.encode("utf-8", "surrogatepass"),
+                    match_event_handler=_on_hyperscan_match, context=hits)
+            return min(hits) if hits else None
+        return match
+
+    pattern_set = _compile_set(BLOCKED_PATTERNS)
+    if pattern_set is not None:
+        def match(command: str) -> int | None:
+            # Bytes for the same reason as in _search
+            hits = pattern_set.Match(command.encode("utf-8", "surrogatepass"))
+            return min(hits) if hits else None
+        return match
+
+    # Group patterns by their literal prefix (mostly the command word: rm, git,
+    # curl, ...) and only run the groups whose prefix occurs in the command.
+    # Each group is one alternation of named groups (p0, p1, ...) that map
+    # back to pattern indexes. Prefixes are matched anywhere, not just as the
+    # first word, so "ls && rm -rf /" or "sudo rm -rf /" are still checked.
+    by_prefix = {}
+    for i, pattern in enumerate(BLOCKED_PATTERNS):
+        by_prefix.setdefault(_literal_prefix(pattern), []).append(f"(?P<p{i}>{pattern})")
+    regexes = [(prefix, _compile("|".join(group))) for prefix, group in by_prefix.items()]
+
+    def match(command: str) -> int | None:
+        lowered = command.lower()
+        hits = []
+        for prefix, regex in regexes:
+            if prefix in lowered:
+                found = _search(regex, command)
+                if found:
+                    hits.append(int(found.lastgroup[1:]))
+        return min(hits) if hits else None
+    return match
+
+
+@functools.cache
+def _warning_regexes():
+    """Compile WARNING_PATTERNS on first use; only needed when LOG_WARNINGS is set."""
+    return tuple((_compile(p), p) for p in WARNING_PATTERNS)
+
+
+def load_hook_input() -> dict:
+    """Parse the hook input JSON from the raw bytes on stdin."""
+    return json.loads(sys.stdin.buffer.read())
+
 
 def extract_command(hook_input: dict) -> str | None:
     """Extract the command from hook input JSON."""
@@ -90,9 +328,15 @@ def check_dangerous(command: str) -> tuple[bool, str]:
     Check if a command matches dangerous patterns.
     Returns (is_blocked, reason).
     """
-    for pattern in BLOCKED_PATTERNS:
-        if re.search(pattern, command, re.IGNORECASE):
-            return True, f"BLOCKED: Command matches dangerous pattern: {pattern}"
+    # A pattern without a literal prefix could match anything, so it turns
+    # the prescreen off rather than risk missing a match
+    lowered = command.lower()
+    if "" not in _TRIGGER_TOKENS and not any(token in lowered for token in _TRIGGER_TOKENS):
+        return False, ""
+
+    index = _blocked_matcher()(command)
+    if index is not None:
+        return True, f"BLOCKED: Command matches dangerous pattern: {BLOCKED_PATTERNS[index]}"
     return False, ""
 
 
@@ -102,8 +346,8 @@ def check_warning(command: str) -> tuple[bool, str]:
     Returns (should_warn, reason).
     """
     warnings = []
-    for pattern in WARNING_PATTERNS:
-        if re.search(pattern, command, re.IGNORECASE):
+    for regex, pattern in _warning_regexes():
+        if _search(regex, command):
             warnings.append(pattern)
 
     if warnings:
@@ -114,18 +358,22 @@ def check_warning(command: str) -> tuple[bool, str]:
 def main():
     # Read hook input from stdin
     try:
-        hook_input = json.load(sys.stdin)
+        hook_input = load_hook_input()
     except json.JSONDecodeError:
         # If we can't parse input, allow (fail open for usability)
         sys.exit(0)
 
     command = extract_command(hook_input)
-    if not command:
+    if not command or not command.strip():
         # No command found, allow
         sys.exit(0)
 
-    # Check for blocked patterns
-    is_blocked, block_reason = check_dangerous(command)
+    # Check for blocked patterns. Fail closed if matching itself fails: any
+    # exit code other than 2 lets the command run.
+    try:
+        is_blocked, block_reason = check_dangerous(command)
+    except Exception as e:
+        is_blocked, block_reason = True, f"BLOCKED: Could not check command: {e!r}"
     if is_blocked:
         print(block_reason, file=sys.stderr)
         print(f"\nCommand was: {command[:200]}...", file=sys.stderr)
@@ -133,11 +381,12 @@ def main():
         sys.exit(2)  # Exit 2 = block with message
 
     # Check for warning patterns (logged but allowed)
-    should_warn, warn_reason = check_warning(command)
-    if should_warn:
-        # Log warning but allow - could write to a log file here
-        # For now just allow, but you could modify to require confirmation
-        pass
+    if LOG_WARNINGS:
+        should_warn, warn_reason = check_warning(command)
+        if should_warn:
+            # Log warning but allow - could write to a log file here
+            # For now just allow, but you could modify to require confirmation
+            print(warn_reason, file=sys.stderr)
 
     # Allow the command
     sys.exit(0)
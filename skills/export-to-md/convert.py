@@ -10,58 +10,120 @@ This script:
 """
 
 import argparse
+import io
+import os
 import re
 import sys
+from collections.abc import Iterable, Iterator
 from datetime import datetime
 from pathlib import Path
 
 # Box-drawing and terminal characters to remove
 BOX_CHARS = r'[╭╮╰╯│─┌┐└┘├┤┬┴┼═║╔╗╚╝╠╣╦╩╬▐▛▜▌▝▘]'
+ANSI_CODES = r'\x1b\[[0-9;]*[mK]'
+
+# Common terminal artifacts, for str.translate: markers removed, ellipsis expanded
+TERMINAL_ARTIFACTS = str.maketrans({'⏺': None, '⎿': None, '✻': None, '…': '...'})
+
+# Timing indicator shown after each response
+TIMING_PATTERN = r'Sautéed for \d+[ms]'
+
+# Commands that shouldn't be included in the output
+SYSTEM_COMMANDS = ('/rename', '/help', '/clear', '/exit', '/model', '/logout', '/export')
+
+# CLI system responses (not Claude's actual response)
+SYSTEM_RESPONSES = [
+    'Please provide a name for the session',
+    'Session renamed to:',
+    'Exported conversation to:',
+    'Usage: /rename',
+    'Usage: /help',
+]
+
+# Lines that are part of the CLI welcome banner
+CLI_BANNER_INDICATORS = [
+    'Claude Code v',
+    'Welcome back',
+    'Tips for getting',
+    'Run /init',
+    'Recent activity',
+    'No recent activity',
+    'API Usage Billing',
+    'Organization',
+    'Auth conflict',
+    'Trying to use',
+    '/model to try',
+]
+
+# Compiled once; most of these run on every line of the export
+_LINE_NUMBER_RE = re.compile(r'^\s*\d+→')
+# ANSI codes and box characters in one pass, for clean_line
+_TERMINAL_ARTIFACTS_RE = re.compile(f'{ANSI_CODES}|{BOX_CHARS}')
+_WHITESPACE_LINE_RE = re.compile(r'^[^\S\n]+$', re.MULTILINE)
+# More than two blank lines: between content, or at the start of the text
+_EXCESS_NEWLINES_RE = re.compile(r'\n{4,}')
+_EXCESS_LEADING_NEWLINES_RE = re.compile(r'\A\n{3,}')
+_PROMPT_MARKER_RE = re.compile(r'^❯\s*')
+_SEPARATOR_RE = re.compile(r'^[-=]{3,}$')
+# Likely export file names: a date, or 'export', 'command' or 'message'
+_EXPORT_NAME_RE = re.compile(r'\d{4}-\d{2}-\d{2}|export|command|message', re.IGNORECASE)
+_UNSAFE_TITLE_CHARS_RE = re.compile(r'[^\w\s-]')
+# Banner indicators as a single alternation, so a line is checked in one scan
+_CLI_BANNER_RE = re.compile('|'.join(map(re.escape, CLI_BANNER_INDICATORS)))
+
+# The line kinds parse_export acts on after the banner, as one match call.
+# The alternation is anchored at the start of the line and tried in order, so
+# the lookaheads give timing > system response > user prompt priority.
+_LINE_KIND_RE = re.compile(
+    f'(?=.*(?P<timing>{TIMING_PATTERN}))'
+    f'|(?=.*(?P<system_response>{"|".join(map(re.escape, SYSTEM_RESPONSES))}))'
+    r'|(?P<user_prompt>\s*❯)'
+)
 
 # Obsidian vault path
 OBSIDIAN_VAULT = Path.home() / "Library/Mobile Documents/iCloud~md~obsidian/Documents/ericpardee"
 
 
-def remove_line_numbers(text: str) -> str:
-    """Remove line number prefixes like '   123→' from the text."""
-    return re.sub(r'^\s*\d+→', '', text, flags=re.MULTILINE)
+def remove_line_numbers(line: str) -> str:
+    """Remove a line number prefix like '   123→' from a single line."""
+    return _LINE_NUMBER_RE.sub('', line)
 
 
-def remove_box_chars(text: str) -> str:
-    """Remove box-drawing characters."""
-    return re.sub(BOX_CHARS, '', text)
-
+def collapse_whitespace_chunks(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Collapse multiple blank lines to a maximum of two, and empty out
+    whitespace-only lines, in text streamed as newline-terminated chunks.
 
-def remove_ansi_codes(text: str) -> str:
-    """Remove ANSI escape codes."""
-    return re.sub(r'\x1b\[[0-9;]*[mK]', '', text)
+    The newline ending the last chunk is dropped. Trailing newlines of each
+    chunk are held back and joined to the next, so blank-line runs that span
+    chunks collapse exactly as they would in the whole text.
+    """
+    pending = ''
+    at_start = True
+    for chunk in chunks:
+        # Empty out lines that are only whitespace
+        text = pending + _WHITESPACE_LINE_RE.sub('', chunk)
+        body = text.rstrip('\n')
+        pending = text[len(body):]
+        if not body:
+            continue
 
+        # Then collapse excessive blank lines
+        body = _EXCESS_NEWLINES_RE.sub('\n\n\n', body)
+        if at_start:
+            body = _EXCESS_LEADING_NEWLINES_RE.sub('\n\n', body)
+            at_start = False
+        yield body
 
-def collapse_whitespace(text: str) -> str:
-    """Collapse multiple blank lines to maximum of two, and clean up spacing."""
-    # First, collapse excessive blank lines
-    text = re.sub(r'\n{4,}', '\n\n\n', text)
-    # Remove lines that are only whitespace
-    lines = text.split('\n')
-    cleaned_lines = []
-    blank_count = 0
-    for line in lines:
-        if not line.strip():
-            blank_count += 1
-            if blank_count <= 2:
-                cleaned_lines.append('')
-        else:
-            blank_count = 0
-            cleaned_lines.append(line)
-    return '\n'.join(cleaned_lines)
+    pending = pending[:-1]
+    yield '\n\n' if len(pending) > 2 else pending
 
 
 def clean_line(line: str) -> str:
     """Clean a single line of terminal artifacts."""
-    line = remove_ansi_codes(line)
-    line = remove_box_chars(line)
+    line = _TERMINAL_ARTIFACTS_RE.sub('', line)
     # Remove common terminal artifacts
-    line = line.replace('⏺', '').replace('⎿', '').replace('✻', '').replace('…', '...')
+    line = line.translate(TERMINAL_ARTIFACTS)
     # Strip trailing whitespace but preserve leading (for indentation)
     line = line.rstrip()
     return line
@@ -75,63 +137,23 @@ def is_user_prompt(line: str) -> bool:
 
 def is_system_command(line: str) -> bool:
     """Check if line is a system command like /rename, /help, etc."""
-    stripped = line.strip()
-    # Commands that shouldn't be included in the output
-    system_commands = ['/rename', '/help', '/clear', '/exit', '/model', '/logout', '/export']
-    return any(stripped.startswith(cmd) for cmd in system_commands)
-
-
-def is_system_response(line: str) -> bool:
-    """Check if line is a CLI system response (not Claude's actual response)."""
-    stripped = line.strip()
-    system_responses = [
-        'Please provide a name for the session',
-        'Session renamed to:',
-        'Exported conversation to:',
-        'Usage: /rename',
-        'Usage: /help',
-    ]
-    return any(resp in stripped for resp in system_responses)
+    return line.strip().startswith(SYSTEM_COMMANDS)
 
 
 def is_cli_banner(line: str) -> bool:
     """Check if line is part of the CLI welcome banner."""
-    banner_indicators = [
-        'Claude Code v',
-        'Welcome back',
-        'Tips for getting',
-        'Run /init',
-        'Recent activity',
-        'No recent activity',
-        'API Usage Billing',
-        'Organization',
-        'Auth conflict',
-        'Trying to use',
-        '/model to try',
-    ]
-    return any(indicator in line for indicator in banner_indicators)
-
-
-def is_tool_call(line: str) -> bool:
-    """Check if line is a tool call summary."""
-    tool_patterns = [
-        r'^Read\(',
-        r'^Bash\(',
-        r'^Write\(',
-        r'^Glob\(',
-        r'^Grep\(',
-        r'^Edit\(',
-        r'Read \d+ lines',
-        r'Read image',
-        r'Read PDF',
-    ]
-    stripped = line.strip()
-    return any(re.match(pattern, stripped) for pattern in tool_patterns)
+    return bool(_CLI_BANNER_RE.search(line))
 
 
-def is_timing_line(line: str) -> bool:
-    """Check if line is a timing indicator."""
-    return bool(re.match(r'.*Sautéed for \d+[ms]', line))
+def line_kind(line: str) -> str | None:
+    """
+    Classify a cleaned line in a single regex call.
+
+    Returns 'timing', 'system_response' or 'user_prompt' (in that order of
+    precedence), or None for ordinary content.
+    """
+    match = _LINE_KIND_RE.match(line)
+    return match.lastgroup if match else None
 
 
 def has_claude_marker(line: str) -> bool:
@@ -140,22 +162,39 @@ def has_claude_marker(line: str) -> bool:
     return '⏺' in line
 
 
-def parse_export(content: str) -> list[dict]:
+def _write_line(out: io.StringIO, line: str = '') -> None:
+    """Write a line and its newline to the buffer."""
+    out.write(line)
+    out.write('\n')
+
+
+def _append_turn(turns: list[dict], turn_type: str | None, content: io.StringIO) -> None:
+    """Append the buffered turn to turns, if there is one."""
+    if turn_type and content.tell():
+        # Every buffered line ends with a newline; drop the final one
+        turns.append({
+            'type': turn_type,
+            'content': content.getvalue()[:-1]
+        })
+
+
+def parse_export(lines: Iterable[str]) -> list[dict]:
     """
-    Parse the export content into a list of conversation turns.
+    Parse the export lines into a list of conversation turns.
 
+    Accepts any iterable of lines (such as an open file), so the export is
+    streamed rather than read into memory at once.
     Returns a list of dicts with 'type' ('user' or 'claude') and 'content'.
     """
-    # Remove line numbers first
-    content = remove_line_numbers(content)
-
-    lines = content.split('\n')
     turns = []
     current_turn = None
-    current_content = []
+    current_content = io.StringIO()
     skip_banner = True
 
-    for i, line in enumerate(lines):
+    for line in lines:
+        # Remove line numbers first
+        line = remove_line_numbers(line.rstrip('\n'))
+
         # Check for Claude marker BEFORE cleaning (marker gets removed by clean_line)
         is_claude_start = has_claude_marker(line)
         cleaned = clean_line(line)
@@ -169,73 +208,60 @@ def parse_export(content: str) -> list[dict]:
             else:
                 continue
 
-        # Skip timing lines
-        if is_timing_line(cleaned):
-            continue
+        kind = line_kind(cleaned)
 
-        # Skip system responses
-        if is_system_response(cleaned):
+        # Skip timing lines and system responses
+        if kind in ('timing', 'system_response'):
             continue
 
         # Check for user prompt (starts with ❯)
-        if is_user_prompt(cleaned):
-            prompt_text = re.sub(r'^❯\s*', '', cleaned.strip())
+        if kind == 'user_prompt':
+            prompt_text = _PROMPT_MARKER_RE.sub('', cleaned.strip())
             if is_system_command(prompt_text):
                 # Save previous turn and skip this command
-                if current_turn and current_content:
-                    turns.append({
-                        'type': current_turn,
-                        'content': '\n'.join(current_content)
-                    })
+                _append_turn(turns, current_turn, current_content)
                 current_turn = None
-                current_content = []
+                current_content = io.StringIO()
                 continue
 
             # Save previous turn if exists
-            if current_turn and current_content:
-                turns.append({
-                    'type': current_turn,
-                    'content': '\n'.join(current_content)
-                })
+            _append_turn(turns, current_turn, current_content)
 
             # Start new user turn
             current_turn = 'user'
-            current_content = [prompt_text] if prompt_text else []
+            current_content = io.StringIO()
+            if prompt_text:
+                _write_line(current_content, prompt_text)
 
         elif is_claude_start and current_turn != 'claude':
             # Line has ⏺ marker and we're not already in Claude's response
             # This is the START of Claude's response
-            if current_turn and current_content:
-                turns.append({
-                    'type': current_turn,
-                    'content': '\n'.join(current_content)
-                })
+            _append_turn(turns, current_turn, current_content)
             current_turn = 'claude'
-            current_content = [cleaned] if cleaned.strip() else []
+            current_content = io.StringIO()
+            if cleaned.strip():
+                _write_line(current_content, cleaned)
 
         elif is_claude_start and current_turn == 'claude':
             # We're already in Claude's response, just continue
-            current_content.append(cleaned)
+            _write_line(current_content, cleaned)
 
         elif current_turn == 'user':
             # Continue user prompt (multi-line)
-            current_content.append(cleaned)
+            _write_line(current_content, cleaned)
 
         elif current_turn == 'claude':
             # Continue Claude's response
-            current_content.append(cleaned)
+            _write_line(current_content, cleaned)
 
         elif cleaned.strip():
             # No current turn, start as Claude
             current_turn = 'claude'
-            current_content = [cleaned]
+            current_content = io.StringIO()
+            _write_line(current_content, cleaned)
 
     # Don't forget the last turn
-    if current_turn and current_content:
-        turns.append({
-            'type': current_turn,
-            'content': '\n'.join(current_content)
-        })
+    _append_turn(turns, current_turn, current_content)
 
     return turns
 
@@ -247,17 +273,16 @@ def clean_content(content: str) -> str:
     prev_was_separator = False
 
     # Find minimum indentation (excluding empty lines)
-    non_empty_lines = [line for line in lines if line.strip()]
-    if non_empty_lines:
-        min_indent = min(len(line) - len(line.lstrip()) for line in non_empty_lines)
-    else:
-        min_indent = 0
+    min_indent = min(
+        (len(line) - len(line.lstrip()) for line in lines if line.strip()),
+        default=0,
+    )
 
     for line in lines:
         stripped = line.strip()
 
         # Skip standalone separator lines (---, ===, etc.)
-        if re.match(r'^[-=]{3,}$', stripped):
+        if _SEPARATOR_RE.match(stripped):
             # Only keep if it follows content (acts as header underline)
             if cleaned and cleaned[-1].strip():
                 prev_was_separator = True
@@ -279,18 +304,28 @@ def clean_content(content: str) -> str:
     return '\n'.join(cleaned)
 
 
-def format_markdown(turns: list[dict], title: str) -> str:
-    """Format the conversation turns as clean Markdown."""
-    lines = []
+def format_markdown(turns: list[dict], title: str) -> Iterator[str]:
+    """
+    Format the conversation turns as clean Markdown.
+
+    Yields the document in chunks (front matter, then roughly one per turn)
+    so it can be written out without building the whole string.
+    """
+    return collapse_whitespace_chunks(_markdown_sections(turns, title))
 
+
+def _markdown_sections(turns: list[dict], title: str) -> Iterator[str]:
+    """Yield the newline-terminated Markdown sections before whitespace cleanup."""
     # Add YAML frontmatter
     today = datetime.now().strftime('%Y-%m-%d')
-    lines.append('---')
-    lines.append(f'title: "{title}"')
-    lines.append(f'date: {today}')
-    lines.append('tags: [claude-code, conversation]')
-    lines.append('---')
-    lines.append('')
+    yield (
+        '---\n'
+        f'title: "{title}"\n'
+        f'date: {today}\n'
+        'tags: [claude-code, conversation]\n'
+        '---\n'
+        '\n'
+    )
 
     for turn in turns:
         content = turn['content'].strip()
@@ -299,6 +334,7 @@ def format_markdown(turns: list[dict], title: str) -> str:
 
         # Clean up the content
         content = clean_content(content)
+        out = io.StringIO()
 
         if turn['type'] == 'user':
             # User prompts as H1
@@ -308,44 +344,35 @@ def format_markdown(turns: list[dict], title: str) -> str:
             # Truncate long headers
             if len(header) > 80:
                 header = header[:77] + '...'
-            lines.append(f'# {header}')
+            _write_line(out, f'# {header}')
             # Add remaining content if any
             if len(content_lines) > 1:
                 remaining = '\n'.join(content_lines[1:]).strip()
                 if remaining:
-                    lines.append('')
-                    lines.append(remaining)
+                    _write_line(out)
+                    _write_line(out, remaining)
         else:
             # Claude responses with H2 header
-            lines.append('')
-            lines.append('## Claude')
-            lines.append('')
-            lines.append(content)
+            _write_line(out)
+            _write_line(out, '## Claude')
+            _write_line(out)
+            _write_line(out, content)
 
-        lines.append('')
-
-    result = '\n'.join(lines)
-    # Clean up excessive whitespace
-    result = collapse_whitespace(result)
-    return result
+        _write_line(out)
+        yield out.getvalue()
 
 
 def find_export_files(directory: Path) -> list[Path]:
     """Find Claude Code export txt files in the directory."""
-    txt_files = list(directory.glob('*.txt'))
+    # One directory pass; DirEntry caches the file type from the listing
+    with os.scandir(directory) as entries:
+        txt_names = [e.name for e in entries if e.name.endswith('.txt') and e.is_file()]
+
     # Filter to likely export files (contain date pattern or specific naming)
-    export_files = []
-    for f in txt_files:
-        name = f.name.lower()
-        # Look for files with date patterns or 'export' or 'command' in name
-        if (re.search(r'\d{4}-\d{2}-\d{2}', name) or
-            'export' in name or
-            'command' in name or
-            'message' in name):
-            export_files.append(f)
+    export_names = [name for name in txt_names if _EXPORT_NAME_RE.search(name)]
 
     # If no matches, return all txt files
-    return export_files if export_files else txt_files
+    return [directory / name for name in (export_names or txt_names)]
 
 
 def main():
@@ -417,9 +444,8 @@ def main():
 
     # Read and parse the file
     print(f"Reading: {input_path}")
-    content = input_path.read_text(encoding='utf-8')
-
-    turns = parse_export(content)
+    with input_path.open(encoding='utf-8') as f:
+        turns = parse_export(f)
 
     if not turns:
         print("Error: Could not parse any conversation turns from the file.")
@@ -434,15 +460,12 @@ def main():
         if not title:
             title = f"Claude Conversation - {datetime.now().strftime('%Y-%m-%d')}"
 
-    # Format as markdown
-    markdown = format_markdown(turns, title)
-
     # Determine output path
     if args.output:
         output_path = Path(args.output)
     else:
         # Use Obsidian vault
-        safe_title = re.sub(r'[^\w\s-]', '', title).strip().replace(' ', '-')
+        safe_title = _UNSAFE_TITLE_CHARS_RE.sub('', title).strip().replace(' ', '-')
         today = datetime.now().strftime('%Y-%m-%d')
         filename = f"{today}-{safe_title}.md"
         output_path = OBSIDIAN_VAULT / filename
@@ -450,8 +473,10 @@ def main():
     # Ensure parent directory exists
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Write output
-    output_path.write_text(markdown, encoding='utf-8')
+    # Format as markdown, writing each chunk as it is produced
+    with output_path.open('wb') as f:
+        for chunk in format_markdown(turns, title):
+            f.write(chunk.encode('utf-8'))
     print(f"Saved: {output_path}")
 
     return 0